@@ -0,0 +1,65 @@
+import tempfile
+import unittest
+from pathlib import Path
+
+from youtubecollector import data_utils
+
+
+def get_responses(video_ids):
+    return dict(
+        (video_id, [{"text": f"comment on {video_id}", "like_count": 1}])
+        for video_id in video_ids
+    )
+
+
+class TestCommentsLog(unittest.TestCase):
+    def setUp(self):
+        self.tmp_dir = tempfile.TemporaryDirectory()
+        self.file = Path(self.tmp_dir.name) / "x-toplevelcomments-2026-01-01.arrows"
+        self.addCleanup(self.tmp_dir.cleanup)
+        self.addCleanup(self.restart)
+
+    def restart(self):
+        """Forgets the cached state of the logs, as after a restart"""
+        data_utils._SAVED_VIDEO_IDS.clear()
+        data_utils._COMMENTS_LOG_ENDS.clear()
+
+    def test_append_after_torn_write(self):
+        data_utils.append_response_comments(self.file, get_responses(["v0", "v1"]))
+        first_end = self.file.stat().st_size
+        data_utils.append_response_comments(self.file, get_responses(["v2", "v3"]))
+        log = self.file.read_bytes()
+        # Cut the log at every point within the second stream
+        for cut in range(first_end + 1, len(log)):
+            with self.subTest(cut=cut):
+                self.restart()
+                self.file.write_bytes(log[:cut])
+                self.assertEqual(
+                    data_utils.get_saved_video_ids(self.file), {"v0", "v1"}
+                )
+                data_utils.append_response_comments(
+                    self.file, get_responses(["v2", "v4"])
+                )
+                self.restart()
+                self.assertEqual(
+                    data_utils.load_response_file(self.file),
+                    get_responses(["v0", "v1", "v2", "v4"]),
+                )
+
+    def test_compact_keeps_first_response(self):
+        data_utils.append_response_comments(self.file, get_responses(["v0", "v1"]))
+        data_utils.append_response_comments(
+            self.file, dict(v1=[{"text": "later", "like_count": 2}])
+        )
+        data_utils.append_response_comments(self.file, get_responses(["v2"]))
+        data_utils.compact_response_comments(self.file)
+        tables, end = data_utils.read_comments_streams(self.file)
+        self.assertEqual((len(tables), end), (1, self.file.stat().st_size))
+        self.assertEqual(
+            data_utils.load_response_file(self.file),
+            get_responses(["v0", "v1", "v2"]),
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
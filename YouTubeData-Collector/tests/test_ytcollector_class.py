@@ -0,0 +1,33 @@
+import datetime
+import unittest
+from zoneinfo import ZoneInfo
+
+from youtubecollector.ytcollector_class import get_seconds_until_quota_reset
+
+PACIFIC = ZoneInfo("America/Los_Angeles")
+
+
+def get_hours_until_reset(*args):
+    now = datetime.datetime(*args, tzinfo=PACIFIC)
+    return get_seconds_until_quota_reset(now) / 3600
+
+
+class TestQuotaReset(unittest.TestCase):
+    def test_regular_day(self):
+        self.assertEqual(get_hours_until_reset(2026, 1, 15, 0, 30), 23.5)
+
+    def test_daylight_saving_time_starts(self):
+        # Clocks are set forward at 02:00, the day has 23 hours
+        self.assertEqual(get_hours_until_reset(2026, 3, 8, 0, 30), 22.5)
+
+    def test_daylight_saving_time_ends(self):
+        # Clocks are set back at 02:00, the day has 25 hours
+        self.assertEqual(get_hours_until_reset(2026, 11, 1, 0, 30), 24.5)
+
+    def test_other_time_zone(self):
+        now = datetime.datetime(2026, 1, 15, 12, tzinfo=datetime.timezone.utc)
+        self.assertEqual(get_seconds_until_quota_reset(now) / 3600, 20)
+
+
+if __name__ == "__main__":
+    unittest.main()
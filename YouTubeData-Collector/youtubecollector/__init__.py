@@ -10,4 +10,4 @@ FP_LOGS = FP_REPO / 'logs'
 FP_FIGS = FP_REPO / 'figs'
 fps = [FP_DATA_PROC, FP_DATA_RAW, FP_LOGS, FP_FIGS, FP_DATA_TMP]
 for fp in fps:
-    Path.mkdir(fp, exist_ok=True)
+    fp.mkdir(parents=True, exist_ok=True)
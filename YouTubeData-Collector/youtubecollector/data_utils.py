@@ -1,13 +1,55 @@
 import datetime
-from collections import OrderedDict
+import functools
+from itertools import chain
+import os
 from pathlib import Path
+from typing import Union
 import pickle
 import logging
+import tempfile
 
+import orjson
 import pandas as pd
+import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.parquet as pq
 
 from youtubecollector import FP_DATA_RAW, FP_DATA, FP_DATA_PROC, ytcollector
 
+# Codec used when writing parquet files. Set `YTC_PARQUET_CODEC=snappy` to
+# trade file size for cheaper decompression (e.g. when data lives on a RAM disk).
+# Avoid gzip for bulk writes - it is several times slower than zstd/snappy and
+# should only be used for cold archival files.
+PARQUET_CODEC = os.environ.get("YTC_PARQUET_CODEC", "zstd")
+PARQUET_COMPRESSION_LEVEL = 3  # Only used for codecs that support levels
+PARQUET_SUFFIX = "parquet"  # Independent of the codec used
+PARQUET_ROW_GROUP_SIZE = 128 * 1024  # Rows per row group
+# String columns with many repeated values which are stored as categoricals.
+# Count columns (strings from the API) are left out so they can be cast to numbers
+CATEGORICAL_COLUMNS = (
+    "author",
+    "author_channel_id",
+    "author_channel_url",
+    "author_profile_img",
+    "channel",
+    "dimensions",
+    "video_id",
+)
+CATEGORICAL_MAX_UNIQUE_RATIO = 0.5
+# Collected comments are checkpointed as an append-only log of arrow IPC streams.
+# Each save appends one stream with the videos collected since the last save
+COMMENTS_SUFFIX = "arrows"
+COMMENTS_IPC_OPTIONS = pa.ipc.IpcWriteOptions(compression="zstd")
+# Marker written at the end of each complete stream
+COMMENTS_STREAM_EOS = b"\xff\xff\xff\xff\x00\x00\x00\x00"
+# API responses are plain JSON, so they are saved as JSON instead of pickle
+JSON_SUFFIX = "json"
+PICKLE_MAGIC = b"\x80"  # First byte of pickles of protocol 2 and newer
+# Video ids already saved to each comments log, filled on first save to a file
+_SAVED_VIDEO_IDS: dict[Path, set[str]] = {}
+# End offset of the last complete stream of each comments log
+_COMMENTS_LOG_ENDS: dict[Path, int] = {}
+
 
 def load_data(fname: str) -> pd.DataFrame:
     """
@@ -23,46 +65,103 @@ def get_channels_to_collect(df_overview: pd.DataFrame) -> dict[str, str]:
         df_overview
         .assign(channel=lambda df: df.channel.str.lower().str.replace(" ", "-"))
     )
-    channels_to_collect = OrderedDict(zip(df.channel, df.channel_id))
+    channels_to_collect = dict(zip(df.channel, df.channel_id))
     return channels_to_collect
 
 
-def save_df(df, name, folder):
-    folder = FP_DATA_PROC / folder
-    check_folder(folder)
-    fname = get_name(name, suffix="gzip.parquet")
-    df.to_parquet(folder / fname)
+def save_df(
+    df, name, folder, compression=None, compression_level=None, categorize=True
+):
+    compression = compression or PARQUET_CODEC
+    if categorize:
+        df = categorize_columns(df)
+    if compression_level is None and compression in ("zstd", "gzip", "brotli"):
+        compression_level = PARQUET_COMPRESSION_LEVEL
+    folder = get_folder(folder, FP_DATA_PROC)
+    fname = get_name(name, suffix=PARQUET_SUFFIX)
+    # Single chunk per column, so the row groups are not split by the chunks
+    table = pa.Table.from_pandas(df).combine_chunks()
+    with pq.ParquetWriter(
+        folder / fname,
+        table.schema,
+        compression=compression,
+        compression_level=compression_level,
+    ) as writer:
+        writer.write_table(table, row_group_size=PARQUET_ROW_GROUP_SIZE)
     logging.info(f"{fname} saved to {str(FP_DATA_RAW)}")
 
 
+def categorize_columns(
+    df: pd.DataFrame, max_unique_ratio: float = CATEGORICAL_MAX_UNIQUE_RATIO
+) -> pd.DataFrame:
+    """
+    Casts the columns in `CATEGORICAL_COLUMNS` to category if less than
+    `max_unique_ratio` of the values are unique. Categoricals are written as
+    dictionary encoded columns to parquet and read back as categoricals.
+    """
+    num_rows = len(df)
+    casts = dict()
+    for col in CATEGORICAL_COLUMNS:
+        if num_rows == 0 or col not in df:
+            continue
+        if isinstance(df[col].dtype, pd.CategoricalDtype):
+            continue
+        if df[col].nunique() / num_rows < max_unique_ratio:
+            casts[col] = "category"
+    return df.astype(casts) if casts else df
+
+
 def save_response(response, name, folder):
-    file = get_file_response(name, folder)
-    save_pickle(file, response)
+    file = get_file_response(name, folder, suffix=JSON_SUFFIX)
+    save_json(file, response)
     logging.info(f"{name} saved to {str(file.parent)}")
 
 
-def save_response_comments(
-    responses: OrderedDict[str, list[dict]], name: str, folder: str
-):
-    file = get_file_response(name, folder)
+def get_file_comments(name: str, folder: Union[str, Path]) -> Path:
+    """Path of a new comments log, which `save_response_comments` appends to"""
+    return get_file_response(name, folder, suffix=COMMENTS_SUFFIX)
 
-    # Load previously constructed dict or create new
-    response_comments = check_comments_file_exists(file)
 
-    # Fill dictionary with thread id
-    for video_id in responses:
-        if video_id not in response_comments:  # Only insert new collected
-            response = responses[video_id]
-            response_comments[video_id] = response
-    logging.info(f"Number of videos in saved response: {len(response_comments)}")
+def save_response_comments(responses: dict[str, list[dict]], file: Path):
+    """Appends the responses of videos not saved to the comments log yet"""
+    saved_video_ids = get_saved_video_ids(file)
 
-    # Save again
-    save_pickle(file, response_comments)
+    # Only append new collected
+    new_responses = dict(
+        (video_id, response)
+        for video_id, response in responses.items()
+        if video_id not in saved_video_ids
+    )
+    # The first save always writes a (possibly empty) stream, so the log
+    # exists for a restore also if there is nothing to save yet
+    if new_responses or not file.exists():
+        append_response_comments(file, new_responses)
+        saved_video_ids.update(new_responses)
+    logging.info(f"Number of videos in saved response: {len(saved_video_ids)}")
+
+
+def get_saved_video_ids(file: Path) -> set[str]:
+    """Returns the video ids saved to the comments log"""
+    if file not in _SAVED_VIDEO_IDS or not file.exists():
+        _SAVED_VIDEO_IDS[file] = load_saved_video_ids(file)
+    return _SAVED_VIDEO_IDS[file]
+
+
+def load_saved_video_ids(file: Path) -> set[str]:
+    """Reads only the video ids of the comments log, not the comments"""
+    if not file.exists():
+        return set()
+    tables = read_comments_tables(file, video_ids_only=True)
+    return set(
+        chain.from_iterable(table["video_id"].to_pylist() for table in tables)
+    )
 
 
-def save_videos_with_disabled_comments(video_ids: list, name: str, folder: str) -> None:
-    file = get_file_response(name, folder)
-    save_pickle(file, video_ids)
+def save_videos_with_disabled_comments(
+    video_ids: list, name: str, folder: Union[str, Path]
+) -> None:
+    file = get_file_response(name, folder, suffix=JSON_SUFFIX)
+    save_json(file, video_ids)
 
 
 def save_pickle(file, data):
@@ -70,10 +169,100 @@ def save_pickle(file, data):
         pickle.dump(data, f)
 
 
-def get_file_response(name: str, folder: str) -> Path:
-    folder = FP_DATA_RAW / folder
-    check_folder(folder)
-    name = get_name(name, suffix="pkl")
+def save_json(file, data):
+    with open(file, "wb") as f:
+        f.write(orjson.dumps(data, option=orjson.OPT_NON_STR_KEYS))
+
+
+def get_comments_table(responses: dict[str, list[dict]]) -> pa.Table:
+    """Table with a row (and list of comments) per video"""
+    table = pa.table(
+        {
+            "video_id": pa.array(list(responses.keys()), type=pa.string()),
+            # from_pandas=True: store NaN (e.g. missing author ids) as null
+            "comments": pa.array(list(responses.values()), from_pandas=True),
+        }
+    )
+    return table
+
+
+def write_comments_stream(f, responses: dict[str, list[dict]]) -> None:
+    write_comments_table(f, get_comments_table(responses))
+
+
+def write_comments_table(f, table: pa.Table) -> None:
+    with pa.ipc.new_stream(f, table.schema, options=COMMENTS_IPC_OPTIONS) as writer:
+        writer.write_table(table)
+
+
+def append_response_comments(
+    file: Path, responses: dict[str, list[dict]]
+) -> None:
+    """
+    Appends the responses as a new stream after the last complete stream of
+    the comments log. Data of an interrupted save is truncated first, as the
+    streams after it could not be read otherwise.
+    """
+    end = get_comments_log_end(file)
+    with open(file, "ab") as f:
+        if f.tell() > end:
+            logging.info(f"Truncating incomplete data at the end of {str(file)}")
+            f.truncate(end)
+        write_comments_stream(f, responses)
+        _COMMENTS_LOG_ENDS[file] = f.tell()
+
+
+def get_comments_log_end(file: Path) -> int:
+    """Returns the end offset of the last complete stream of the comments log"""
+    if file not in _COMMENTS_LOG_ENDS or not file.exists():
+        _, _COMMENTS_LOG_ENDS[file] = read_comments_streams(file, video_ids_only=True)
+    return _COMMENTS_LOG_ENDS[file]
+
+
+def compact_response_comments(file: Path) -> None:
+    """Rewrites the comments log as a single stream"""
+    tables = read_comments_tables(file)
+    if len(tables) <= 1:
+        return None  # Already a single stream
+    # The comments stay arrow data, they are not converted to python objects.
+    # Permissive promotion unifies e.g. empty streams and all-null fields
+    table = pa.concat_tables(tables, promote_options="permissive")
+    table = drop_duplicate_videos(table)
+    # The tmp file is named so it does not match the globs for the saved files
+    # if left behind, and is in the same folder such that the replace is atomic
+    with tempfile.NamedTemporaryFile(
+        dir=file.parent, prefix=".compact-", delete=False
+    ) as f:
+        write_comments_table(f, table.combine_chunks())
+    os.replace(f.name, file)
+    _COMMENTS_LOG_ENDS.pop(file, None)
+    logging.info(f"Compacted {str(file)} to {table.num_rows} videos")
+
+
+def drop_duplicate_videos(table: pa.Table) -> pa.Table:
+    """Keeps the first row of each video id, like `load_response_comments`"""
+    if pc.count_distinct(table["video_id"]).as_py() == table.num_rows:
+        return table
+    rows = (
+        table.select(["video_id"])
+        .append_column("row", pa.array(range(table.num_rows), type=pa.int64()))
+        .group_by("video_id", use_threads=False)
+        .aggregate([("row", "min")])["row_min"]
+    )
+    return table.take(rows.take(pc.sort_indices(rows)))
+
+
+def finalize_response_comments(file: Path) -> None:
+    """Compacts the comments log saved by `save_response_comments`"""
+    if file.exists():
+        compact_response_comments(file)
+
+
+def get_file_response(
+    name: str, folder: Union[str, Path], suffix: str = "pkl"
+) -> Path:
+    folder = get_folder(folder, FP_DATA_RAW)
+    name = get_name(name, suffix=suffix)
     file = folder / name
     return file
 
@@ -82,27 +271,29 @@ def get_current_time():
     return datetime.datetime.now().strftime('%F %T')
 
 
-def get_name(name, suffix):
+def get_name(name, suffix=PARQUET_SUFFIX):
     date = datetime.datetime.now().strftime("%F")
     fname = f"{name}-{date}.{suffix}"
     return fname
 
 
+def get_folder(folder: Union[str, Path], main_folder: Path) -> Path:
+    """
+    Returns the folder `folder` in `main_folder` and creates it if needed.
+    A Path is assumed to be a folder which already exists and is used as is.
+    """
+    if isinstance(folder, Path):
+        return folder
+    folder = main_folder / folder
+    check_folder(folder)
+    return folder
+
+
 def check_folder(folder: Path) -> None:
     if not folder.is_dir():
         Path.mkdir(folder)
 
 
-def check_comments_file_exists(file: Path) -> OrderedDict[str, list[dict]]:
-    if file.exists():
-        with open(file, "rb") as f:
-            response: OrderedDict[str, list[dict]] = pickle.load(f)
-        logging.info(f"File already exists. Appending data to existing file..")
-    else:
-        response = OrderedDict()
-    return response
-
-
 def get_reply_count_comparison(df_replies, df_threads):
     gp1 = (
         df_replies.groupby("thread_id")
@@ -117,17 +308,115 @@ def get_reply_count_comparison(df_replies, df_threads):
 
 
 def query_1_month_df(df):
-    mask = (
-        df.upload_dates.apply(pd.to_datetime)
-        .apply(ytcollector.is_uploaded_before_war)
-        .astype(bool)
-    )
-    df = df[~mask].copy()
+    upload_dates = pd.to_datetime(df["upload_dates"], utc=True)
+    mask = ytcollector.is_uploaded_before_war(upload_dates)
+    df = df.loc[~mask].copy()
     return df
 
 
+PICKLE_READ_BUFFER_SIZE = 1024 * 1024  # Fewer read calls for large responses
+
+
 def load_pickle_file(file):
-    with open(file, "rb") as f:
+    """
+    Loads a pickle file. Also loads JSON files, so files saved before and
+    after the switch to JSON can be loaded with the same function.
+    """
+    with open(file, "rb", buffering=PICKLE_READ_BUFFER_SIZE) as f:
+        if f.peek(1)[:1] != PICKLE_MAGIC:
+            return orjson.loads(f.read())
         loaded_file = pickle.load(f)
     return loaded_file
 
+
+def load_json_file(file):
+    with open(file, "rb") as f:
+        loaded_file = orjson.loads(f.read())
+    return loaded_file
+
+
+def load_response_comments(file: Path) -> dict[str, list[dict]]:
+    """
+    Loads the comments log saved with `save_response_comments`.
+    The first saved response is kept if a video id occurs more than once.
+    """
+    return get_response_comments(read_comments_tables(file))
+
+
+def read_comments_tables(
+    file: Path, video_ids_only: bool = False
+) -> list[pa.Table]:
+    """
+    Reads the streams of the comments log as a table per stream.
+    With `video_ids_only` the comments are not read (nor decompressed).
+    """
+    return read_comments_streams(file, video_ids_only=video_ids_only)[0]
+
+
+def read_comments_streams(
+    file: Path, video_ids_only: bool = False
+) -> tuple[list[pa.Table], int]:
+    """
+    Returns the tables of the complete streams of the comments log and the
+    end offset of the last complete stream.
+    """
+    if not file.exists():
+        return list(), 0
+    # `video_id` is the first field, see `get_comments_table`
+    options = pa.ipc.IpcReadOptions(included_fields=[0] if video_ids_only else None)
+    tables = list()
+    end = 0
+    with pa.memory_map(str(file)) as f:
+        while end < f.size():
+            try:
+                table = pa.ipc.open_stream(f, options=options).read_all()
+                # A stream cut off at a message boundary is read without error
+                eos_size = len(COMMENTS_STREAM_EOS)
+                complete = f.read_at(eos_size, f.tell() - eos_size)
+            except (pa.ArrowInvalid, OSError):
+                complete = None
+            if complete != COMMENTS_STREAM_EOS:
+                # Stream only partially written, e.g. if interrupted during a save
+                logging.info(f"Skipping incomplete data at the end of {str(file)}")
+                break
+            tables.append(table)
+            end = f.tell()
+    return tables, end
+
+
+def get_response_comments(tables: list[pa.Table]) -> dict[str, list[dict]]:
+    response: dict[str, list[dict]] = dict()
+    for table in tables:
+        video_ids = table["video_id"].to_pylist()
+        for video_id, comments in zip(video_ids, table["comments"].to_pylist()):
+            response.setdefault(video_id, comments)
+    return response
+
+
+def load_response_file(file: Path):
+    """
+    Loads a saved response based on the file suffix.
+    Comments collected before the switch to arrow are stored as pickle files.
+    """
+    if file.suffix == f".{COMMENTS_SUFFIX}":
+        return load_response_comments(file)
+    if file.suffix == f".{JSON_SUFFIX}":
+        return load_json_file(file)
+    return load_pickle_file(file)
+
+
+def load_response_file_cached(file: Path):
+    """
+    Same as `load_response_file`, but unchanged files are only loaded once.
+    The loaded objects are shared between calls, so callers must not mutate
+    them in-place.
+    """
+    stat = os.stat(file)
+    return _load_response_file_cached(str(file), stat.st_mtime_ns, stat.st_size)
+
+
+@functools.lru_cache(maxsize=32)
+def _load_response_file_cached(file: str, mtime: int, size: int):
+    # Modification time and size are part of the key to reload changed files
+    return load_response_file(Path(file))
+
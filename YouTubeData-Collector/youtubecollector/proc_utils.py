@@ -1,6 +1,9 @@
-import re
+import os
+from concurrent.futures import ThreadPoolExecutor
+from fnmatch import fnmatchcase
+from functools import partial
 from pathlib import Path
-from typing import Callable
+from typing import Callable, Optional, Union
 
 import numpy as np
 import pandas as pd
@@ -15,28 +18,59 @@ CHANNELS = list((f.name for f in FP_DATA_RAW.glob('*')
 
 
 def get_df(
-    name: str, get_dfs_func: Callable[[str], dict[str, pd.DataFrame]]
+    name: str,
+    get_dfs_func: Callable[..., dict[str, pd.DataFrame]],
+    columns: Optional[list[str]] = None,
 ) -> pd.DataFrame:
-    dfs = get_dfs_func(name)
-    dfs = (df.assign(channel=channel) for channel, df in dfs.items())
-    df = pd.concat(dfs, axis=0).reset_index(drop=True)
+    """
+    Concatenates the dataframes of all channels returned by `get_dfs_func`.
+    If `columns` is given only those columns are read (plus `channel`).
+    """
+    dfs = get_dfs_func(name, columns=columns)
+    df = pd.concat(dfs.values(), axis=0, ignore_index=True)
+    df["channel"] = np.repeat(list(dfs), [len(df_) for df_ in dfs.values()])
     return df
 
 
-def get_dfs(name: str) -> dict[str, pd.DataFrame]:
+MAX_READ_WORKERS = 16
+
+
+def get_dfs(
+    name: str, columns: Optional[list[str]] = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Reads the parquet files of all channels concurrently.
+    If `columns` is given only those columns are read from the files,
+    otherwise all columns are read.
+    """
     file_dict = get_file_dict(name, proc=True)
-    dfs = {channel: pd.read_parquet(df) for channel, df in file_dict.items()}
+    if not file_dict:
+        return {}
+    read_func = partial(read_parquet, columns=columns)
+    with ThreadPoolExecutor(max_workers=min(MAX_READ_WORKERS, len(file_dict))) as ex:
+        dfs = dict(zip(file_dict, ex.map(read_func, file_dict.values())))
     return dfs
 
 
-def get_comment_data(name: str) -> dict[str, pd.DataFrame]:
+def read_parquet(file: Path, columns: Optional[list[str]] = None) -> pd.DataFrame:
+    return pd.read_parquet(file, engine="pyarrow", columns=columns, use_threads=True)
+
+
+def get_comment_data(
+    name: str, columns: Optional[list[str]] = None
+) -> dict[str, pd.DataFrame]:
+    """
+    Loads the collected comments of all channels.
+    If `columns` is given only those columns are kept in the dataframes.
+    """
     # Get file paths from raw data 
     collected_comments: dict[str, Path] = get_file_dict(name, proc=False)
     data_comments = {
         channel: pd.DataFrame(
             ytcollector.unpack_dict_of_lists(
-                data_utils.load_pickle_file(collected_comments[channel])
-            )
+                data_utils.load_response_file_cached(collected_comments[channel])
+            ),
+            columns=columns,
         )
         for channel in collected_comments
     }
@@ -56,8 +90,41 @@ def get_file_dict(name: str, proc: bool = False) -> dict[str, Path]:
     return file_dict
 
 
+# Snapshot of each folder listing keyed by folder. The modification time of the
+# folder is stored with the listing, so adding or removing files since the last
+# scan triggers a rescan
+_LIST_CACHE: dict[Path, tuple[int, list[str]]] = {}
+
+
+def invalidate_cache() -> None:
+    """Clears the cached folder listings"""
+    _LIST_CACHE.clear()
+
+
+def list_folder(folder: Path) -> list[str]:
+    """Returns the (cached) names of the entries in the folder"""
+    try:
+        mtime = folder.stat().st_mtime_ns
+    except FileNotFoundError:
+        return []
+    cached = _LIST_CACHE.get(folder)
+    if cached is None or cached[0] != mtime:
+        with os.scandir(folder) as entries:
+            cached = (mtime, [entry.name for entry in entries])
+        _LIST_CACHE[folder] = cached
+    return cached[1]
+
+
+def glob_folder(folder: Path, name: str) -> list[Path]:
+    """In-memory equivalent of `folder.glob(f"*{name}*")`"""
+    pattern = f"*{name}*"
+    return [
+        folder / fname for fname in list_folder(folder) if fnmatchcase(fname, pattern)
+    ]
+
+
 def get_file(folder: Path, name: str) -> Path:
-    files = list(folder.glob(f"*{name}*"))
+    files = glob_folder(folder, name)
     if (len_files := len(files)) == 1:
         (file,) = files
     elif len_files > 1:
@@ -68,19 +135,19 @@ def get_file(folder: Path, name: str) -> Path:
 
 
 def select_latest_file(files: list[Path]) -> Path:
-    files = sorted(files, key=get_file_date, reverse=True)
-    return files[0]
-
+    return max(files, key=get_file_date)
 
-RE_DATE = re.compile(r"\d{4}-\d{2}-\d{2}")
 
-
-def get_file_date(file: Path) -> pd.Timestamp:
-    match = RE_DATE.search(file.name)
-    if not match:
-        raise AssertionError("No match")
-    ts = pd.Timestamp(match.group(0))
-    return ts
+def get_file_date(file: Path) -> tuple[int, int, int]:
+    """
+    Returns the date of a file named `name-YYYY-MM-DD.suffix` as a
+    (year, month, day) tuple, which compares like the date.
+    """
+    try:
+        year, month, day = file.name.rsplit("-", 3)[-3:]
+        return int(year), int(month), int(day[:2])  # Day is followed by suffix
+    except ValueError:
+        raise AssertionError(f"No date in file name {file.name}")
 
 
 def get_df_comments(
@@ -92,33 +159,49 @@ def get_df_comments(
     return df_comments
 
 
+# Columns needed to build the thread id -> video id mapping. Pass as `columns`
+# to the readers above when only the mapping is needed
+MAPPING_COLUMNS = ["thread_id", "video_id"]
+
+
 def get_mapping_threadid_to_videoid(df_toplevel: pd.DataFrame) -> dict:
     """Map thread id to video id for the replies dataframe"""
-    cols = ["thread_id", "video_id"]
-    mapping = (
-        df_toplevel[cols].drop_duplicates().set_index("thread_id")["video_id"].to_dict()
-    )
+    thread_ids, video_ids = (df_toplevel[col].to_numpy() for col in MAPPING_COLUMNS)
+    # A thread belongs to a single video so duplicated thread ids map to the same
+    # video id and can simply be overwritten
+    mapping = dict(zip(thread_ids, video_ids))
     return mapping
 
 
 def add_missing_columns_replies(
-    df_replies: pd.DataFrame, mapping: dict
+    df_replies: pd.DataFrame, mapping: Union[dict, pd.Series]
 ) -> pd.DataFrame:
-    df_replies["total_reply_count"] = np.nan
-    df_replies["video_id"] = df_replies["thread_id"].map(mapping)
+    # Nullable integer instead of float64 NaNs, matching the toplevel counts
+    df_replies["total_reply_count"] = pd.Series(
+        pd.NA, index=df_replies.index, dtype="Int32"
+    )
+    # Mapping with a Series uses a hash table lookup instead of a python loop
+    df_replies["video_id"] = df_replies["thread_id"].map(pd.Series(mapping))
     return df_replies
 
 
 def concat_replies_onto_toplevel(
     df_replies: pd.DataFrame, df_toplevel: pd.DataFrame
 ) -> pd.DataFrame:
-    return pd.concat(
-        (df_toplevel.assign(toplevel=True), df_replies.assign(toplevel=False)), axis=0
-    ).reset_index(drop=True)
+    df_comments = pd.concat((df_toplevel, df_replies), axis=0, ignore_index=True)
+    # Add flag after concatenating to avoid copying both frames with `assign`
+    df_comments["toplevel"] = np.repeat(
+        [True, False], [len(df_toplevel), len(df_replies)]
+    )
+    return df_comments
 
 
-def load_proc_data(name):
+def load_proc_data(name, columns: Optional[list[str]] = None):
+    """
+    Loads processed data from `data/proc/all`.
+    If `columns` is given only those columns are read from the file.
+    """
     folder = FP_DATA_PROC / "all"
     file = get_file(folder, name)
-    df = pd.read_parquet(file)
+    df = read_parquet(file, columns=columns)
     return df
@@ -0,0 +1,135 @@
+import hashlib
+import logging
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from pathlib import Path
+from typing import Union
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+import orjson
+
+CACHE_TTL = 7 * 24 * 60 * 60  # Seconds before a cached response is stale
+# Query parameters which do not change the response, e.g. the API key in use
+IGNORED_PARAMS = ("key",)
+
+
+def get_cache_key(method: str, uri: str) -> str:
+    """
+    Returns a stable hash of the method and the (sorted) query parameters
+    of the request.
+    """
+    params = sorted(
+        (param, value)
+        for param, value in parse_qsl(urlsplit(uri).query)
+        if param not in IGNORED_PARAMS
+    )
+    return hashlib.blake2b((method + urlencode(params)).encode()).hexdigest()
+
+
+class ResponseCache:
+    """Disk-backed cache of API responses stored in a sqlite database
+
+    Attributes:
+        folder: folder of the database file
+        ttl: seconds a cached response is used before it is requested again
+    """
+
+    def __init__(self, folder: Path, ttl: Union[int, float] = CACHE_TTL):
+        self.folder = folder
+        self.ttl = ttl
+        self._conn = None
+        # The connection is shared by the worker threads
+        self._lock = threading.Lock()
+        # Requests being executed, so concurrent identical requests wait for
+        # the same response instead of being sent twice
+        self._in_flight: dict[str, Future] = dict()
+        self._in_flight_lock = threading.Lock()
+
+    def connect(self) -> sqlite3.Connection:
+        """Opens the database on first use and removes the stale responses"""
+        if self._conn is None:
+            self.folder.mkdir(exist_ok=True)
+            self._conn = sqlite3.connect(
+                self.folder / "responses.sqlite", check_same_thread=False
+            )
+            with self._conn:
+                self._conn.execute(
+                    "CREATE TABLE IF NOT EXISTS responses "
+                    "(key TEXT PRIMARY KEY, created REAL, response BLOB)"
+                )
+                self._conn.execute(
+                    "DELETE FROM responses WHERE created < ?",
+                    (time.time() - self.ttl,),
+                )
+        return self._conn
+
+    def get(self, key: str) -> Union[None, dict]:
+        """Returns the cached response or None if missing or stale"""
+        query = "SELECT created, response FROM responses WHERE key = ?"
+        with self._lock:
+            row = self.connect().execute(query, (key,)).fetchone()
+        if row is None or time.time() - row[0] > self.ttl:
+            return None
+        return orjson.loads(row[1])
+
+    def put(self, key: str, response: dict) -> None:
+        with self._lock:
+            conn = self.connect()
+            with conn:  # Commits the transaction
+                conn.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?)",
+                    (key, time.time(), orjson.dumps(response)),
+                )
+
+    def execute(self, request, http=None, cache: bool = True) -> dict:
+        """
+        Returns the cached response of the request if there is one,
+        otherwise executes the request and caches the response.
+        With `cache=False` the request is always sent and not cached.
+        If an identical request is already being executed by another thread,
+        its response (or error) is returned instead.
+        """
+        key = get_cache_key(request.methodId, request.uri)
+        response = self.get(key) if cache else None
+        if response is not None:
+            logging.info(f"Using cached response for {request.methodId}")
+            return response
+        with self._in_flight_lock:
+            future = self._in_flight.get(key)
+            is_owner = future is None
+            if is_owner:
+                future = self._in_flight[key] = Future()
+        if not is_owner:
+            logging.info(f"Waiting for identical request {request.methodId}")
+            return future.result()
+        try:
+            # An identical request may have finished since the lookup above
+            response = self.get(key) if cache else None
+            if response is None:
+                response = request.execute(http=http)
+                if cache:
+                    self.put(key, response)
+        except BaseException as e:
+            future.set_exception(e)
+            raise
+        else:
+            future.set_result(response)
+        finally:
+            with self._in_flight_lock:
+                del self._in_flight[key]
+        return response
+
+    def clear(self) -> None:
+        """Removes all cached responses"""
+        with self._lock:
+            conn = self.connect()
+            with conn:
+                conn.execute("DELETE FROM responses")
+
+    def close(self) -> None:
+        with self._lock:
+            if self._conn is not None:
+                self._conn.close()
+                self._conn = None
@@ -1,12 +1,41 @@
+import atexit
 import logging
+import queue
+from logging.handlers import QueueHandler, QueueListener
 from youtubecollector import FP_LOGS
 import datetime
 
+# Writes the log records to the log file in a background thread
+_QUEUE_LISTENER = None
+
 
 def set_logger(prefix="", suffix=None):
+    """
+    Logs to a file in `logs`. The records are put on a queue and written
+    by a background thread, so logging does not wait on the file.
+    """
+    global _QUEUE_LISTENER
     if not suffix:
         suffix = datetime.datetime.now().strftime("%y%m%d_%H%M")
     logfile_name = FP_LOGS / f"log-{prefix}-{suffix}.log"
+    stop_logger()
     for handler in logging.root.handlers[:]:
         logging.root.removeHandler(handler)
-    logging.basicConfig(level=logging.DEBUG, filename=str(logfile_name))
+    file_handler = logging.FileHandler(str(logfile_name))
+    file_handler.setFormatter(logging.Formatter(logging.BASIC_FORMAT))
+    log_queue = queue.SimpleQueue()
+    logging.root.addHandler(QueueHandler(log_queue))
+    logging.root.setLevel(logging.DEBUG)
+    _QUEUE_LISTENER = QueueListener(log_queue, file_handler)
+    _QUEUE_LISTENER.start()
+
+
+@atexit.register
+def stop_logger():
+    """Writes the queued records and closes the log file"""
+    global _QUEUE_LISTENER
+    if _QUEUE_LISTENER is not None:
+        _QUEUE_LISTENER.stop()
+        for handler in _QUEUE_LISTENER.handlers:
+            handler.close()
+        _QUEUE_LISTENER = None
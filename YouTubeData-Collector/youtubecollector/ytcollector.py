@@ -1,28 +1,111 @@
+import functools
 import time
 import logging
-from typing import Callable
+import threading
+from itertools import chain
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+from typing import Callable, Iterable, Iterator
 from dataclasses import dataclass
+from pathlib import Path
 from typing import Union
 
 
 import googleapiclient
+import httplib2
 from googleapiclient.discovery import build
 from googleapiclient.errors import HttpError
+from googleapiclient.http import build_http
+from googleapiclient.model import JsonModel
+import orjson
 import pandas as pd
 import numpy as np
 
 from youtubecollector import FP_DATA_TMP, data_utils
+from youtubecollector.response_cache import ResponseCache
 
+WAR_START_DATE = pd.Timestamp("2022-02-24", tz="UTC")
+# Videos uploaded before this are uploaded 1 month before the start of the war
+WAR_START_THRESHOLD = WAR_START_DATE - pd.DateOffset(months=1)
+MAX_WORKERS_VIDEOS = 16  # Concurrent requests in `query_videos_list`
+MAX_VIDEO_IDS_PER_REQUEST = 50  # API limit on ids in a `videos.list` request
+MAX_WORKERS_REPLIES = 8  # Concurrent threads in `get_replies_comment_thread`
+# Responses of identical requests are reused, e.g. when restarting a collection
+RESPONSE_CACHE = ResponseCache(FP_DATA_TMP / "api_cache")
 
-def get_youtube_build(api_key):
+# httplib2.Http objects are not thread safe, so each worker thread gets its own
+_thread_local = threading.local()
+
+
+class OrjsonModel(JsonModel):
+    """JsonModel which parses the response bodies with orjson"""
+
+    def deserialize(self, content):
+        try:
+            body = orjson.loads(content)
+        except orjson.JSONDecodeError:
+            # Let the default model handle non-JSON content
+            return super().deserialize(content)
+        if self._data_wrapper and "data" in body:
+            body = body["data"]
+        return body
+
+
+def get_youtube_build(api_key, http: Union[None, httplib2.Http] = None):
     """
     Returns a Resource object for interacting with the youtube API
     based on the input API key.
+    If `http` is given all requests of the Resource are executed with it,
+    reusing its open (keep-alive) connections.
     """
-    youtube = build("youtube", "v3", developerKey=api_key)
+    youtube = build(
+        "youtube",
+        "v3",
+        developerKey=api_key,
+        model=OrjsonModel(),
+        http=http,
+        static_discovery=True,  # Discovery document bundled with the client
+    )
     return youtube
 
 
+@functools.lru_cache(maxsize=8)
+def build_service(api_key) -> googleapiclient.discovery.Resource:
+    """
+    Returns a Resource object for the API key with its own keep-alive Http
+    object. The Resource is built once per API key and reused when switching
+    back to a key.
+    """
+    return get_youtube_build(api_key, http=build_http())
+
+
+# Long-lived thread pools by name and number of workers, see `get_executor`
+_EXECUTORS: dict[tuple[str, int], ThreadPoolExecutor] = dict()
+_EXECUTORS_LOCK = threading.Lock()
+
+
+def get_executor(name: str, max_workers: int) -> ThreadPoolExecutor:
+    """
+    Returns a thread pool which is shared by all calls with the same name and
+    number of workers. Its threads are reused, so their thread-local Http
+    objects keep the connections to the API alive between calls.
+    """
+    key = (name, max_workers)
+    with _EXECUTORS_LOCK:
+        if key not in _EXECUTORS:
+            _EXECUTORS[key] = ThreadPoolExecutor(
+                max_workers=max_workers, thread_name_prefix=f"ytcollector-{name}"
+            )
+        return _EXECUTORS[key]
+
+
+def get_thread_http() -> httplib2.Http:
+    """Returns the Http object used to execute requests in the current thread"""
+    if not hasattr(_thread_local, "http"):
+        _thread_local.http = build_http()
+    return _thread_local.http
+
+
 def unpack_http_error(e: HttpError):
     """
     Unpacks a HttpError from the googleapiclient and returns
@@ -34,10 +117,10 @@ def unpack_http_error(e: HttpError):
     return reason
 
 
-def search_channel_id(youtube, channel_id):
+def search_channel_id(youtube, channel_id, cache=True):
     """Returns a channel response object with id of upload playlist"""
     request = youtube.channels().list(part="contentDetails", id=channel_id)
-    response = request.execute()
+    response = RESPONSE_CACHE.execute(request, cache=cache)
     return response
 
 
@@ -54,20 +137,26 @@ def get_upload_playlist_id(channel_response):
 def pager_snippet(playlist_id, youtube, page_token=None):
     """
     Function to page through a given channels upload playlist.
+    The pages are never cached: page tokens are offsets into the playlist, so
+    cached pages would skip the videos uploaded since they were cached.
     """
     request = youtube.playlistItems().list(
         part="snippet", playlistId=playlist_id, maxResults=50, pageToken=page_token
     )
-    response = request.execute()
+    response = RESPONSE_CACHE.execute(request, cache=False)
     return response
 
 
 def filter_last_items(items: list[dict], cutoff_date: pd.Timestamp) -> list[dict]:
     """Filters video items for videos uploaded too early"""
+    if not items:
+        return items
+    timestamps = pd.to_datetime(
+        [item["snippet"]["publishedAt"] for item in items], utc=True
+    )
+    keep = ~is_uploaded_before(timestamps, cutoff_date=cutoff_date)
     filtered_items = [
-        item
-        for item in items
-        if not is_uploaded_before(get_timestamp(item), cutoff_date=cutoff_date)
+        item for item, keep_item in zip(items, keep.tolist()) if keep_item
     ]
     return filtered_items
 
@@ -83,6 +172,7 @@ def query_uploads_date(
     before the `cutoff_date` specified.
     """
     responses = list()
+    threshold = get_upload_threshold(cutoff_date)  # Computed once for all pages
     videos_uploaded_before_date = False
     next_page_token = None
     while not videos_uploaded_before_date:
@@ -97,7 +187,7 @@ def query_uploads_date(
             ts_last_item = get_timestamp(response["items"][-1])
             if verbose:
                 print(f"Date of last item is: {ts_last_item}")
-            if is_uploaded_before(ts_last_item, cutoff_date=cutoff_date):
+            if is_uploaded_before_threshold(ts_last_item, threshold):
                 if verbose:
                     print(
                         "Last item from API is uploaded before specified date. "
@@ -117,18 +207,48 @@ def get_timestamp(item: dict) -> pd.Timestamp:
     return ts
 
 
-def is_uploaded_before(ts: pd.Timestamp, cutoff_date: pd.Timestamp) -> bool:
+def is_uploaded_before(
+    ts: Union[pd.Timestamp, pd.Series, pd.DatetimeIndex], cutoff_date: pd.Timestamp
+) -> Union[bool, np.ndarray, pd.Series]:
+    """
+    Checks if timestamp is 1 month before the cutoff date.
+    Works for both a single timestamp and arrays of timestamps.
+    """
+    return is_uploaded_before_threshold(ts, get_upload_threshold(cutoff_date))
+
+
+def get_upload_threshold(cutoff_date: pd.Timestamp) -> pd.Timestamp:
+    """
+    Returns the date 1 month before the cutoff date. Compute it once and use
+    `is_uploaded_before_threshold` when checking many timestamps, as
+    `pd.DateOffset(months=1)` is slow.
+    """
+    return cutoff_date - pd.DateOffset(months=1)
+
+
+def is_uploaded_before_threshold(
+    ts: Union[pd.Timestamp, pd.Series, pd.DatetimeIndex], threshold: pd.Timestamp
+) -> Union[bool, np.ndarray, pd.Series]:
+    """Checks if timestamp is before the threshold from `get_upload_threshold`"""
+    return ts < threshold
+
+
+def is_uploaded_before_war(
+    ts: Union[pd.Timestamp, pd.Series, pd.DatetimeIndex]
+) -> Union[bool, np.ndarray, pd.Series]:
     """Checks if timestamp is 1 month before the start of the war"""
-    return (ts + pd.DateOffset(months=1)) < cutoff_date
+    return is_uploaded_before_threshold(ts, WAR_START_THRESHOLD)
 
 
 def get_data_videos_playlist(response):
     """Returns video data from a video response from the upload playlist"""
-    items = response["items"]
-    video_ids = [item["snippet"]["resourceId"]["videoId"] for item in items]
-    upload_dates = [item["snippet"]["publishedAt"] for item in items]
-    titles = [item["snippet"]["title"] for item in items]
-    descriptions = [item["snippet"]["description"] for item in items]
+    video_ids, upload_dates, titles, descriptions = [], [], [], []
+    for item in response["items"]:
+        snippet = item["snippet"]
+        video_ids.append(snippet["resourceId"]["videoId"])
+        upload_dates.append(snippet["publishedAt"])
+        titles.append(snippet["title"])
+        descriptions.append(snippet["description"])
     data = {
         "video_ids": video_ids,
         "upload_dates": upload_dates,
@@ -145,20 +265,37 @@ def get_dataframe_responses(responses, response_data_func):
 
 
 def get_dataframe_dicts(data_dicts) -> pd.DataFrame:
-    dfs = [pd.DataFrame(data_dict) for data_dict in data_dicts]
-    df = pd.concat(dfs, axis=0).reset_index(drop=True)
+    """Merges the dicts column by column and builds a single dataframe"""
+    merged = defaultdict(list)
+    for data_dict in data_dicts:
+        for key, values in data_dict.items():
+            merged[key].extend(values)
+    df = pd.DataFrame(merged)
     return df
 
 
 def query_videos_list(
-    video_ids: list, youtube: googleapiclient.discovery.Resource
+    video_ids: list,
+    youtube: googleapiclient.discovery.Resource,
+    max_workers: int = MAX_WORKERS_VIDEOS,
+    cache: bool = True,
 ) -> list[dict]:
+    """
+    Queries the video data for the video ids in slices of 50.
+    The slices are queried concurrently and the responses are returned in order.
+    """
     slices = get_slices_video_ids(video_ids)
-    responses = list()
-    for vid_slice in slices:
-        subset_video_ids = video_ids[vid_slice]
-        response = get_video_data(subset_video_ids, youtube)
-        responses.append(response)
+    if not slices:
+        return list()
+
+    def query_slice(vid_slice: slice) -> dict:
+        return get_video_data(
+            video_ids[vid_slice], youtube, http=get_thread_http(), cache=cache
+        )
+
+    # Shared pool, so the connections of its threads are reused between channels
+    ex = get_executor("videos", max_workers)
+    responses = list(ex.map(query_slice, slices))
     return responses
 
 
@@ -167,52 +304,51 @@ def get_slices_video_ids(video_ids: list[str]) -> list[slice]:
     Get slices for looping over list of video ids.
     If len(video_ids) % 50 == 0 we should not add an extra part
     """
+    size = MAX_VIDEO_IDS_PER_REQUEST
     num_videos = len(video_ids)
-    num_parts = num_videos // 50 + 1 * (
-        num_videos % 50 != 0
-    )  # API limits 50 video ids pr. request
-    slices = [slice(i * 50, (i + 1) * 50) for i in range(num_parts)]
+    num_parts = num_videos // size + 1 * (num_videos % size != 0)
+    slices = [slice(i * size, (i + 1) * size) for i in range(num_parts)]
     return slices
 
 
-def get_video_data(vidid, youtube):
+def get_video_data(vidid, youtube, http=None, cache=True):
     """
     Queries the API for video data.
+    `vidid` is a single video id or a list of up to 50 video ids, which are
+    sent as one comma separated `id` parameter in a single request.
+    If `http` is given the request is executed with it instead of the
+    Http object of `youtube` (needed when querying from several threads).
     """
+    if not isinstance(vidid, str):
+        vidid = ",".join(vidid)
     request = youtube.videos().list(
-        part="snippet, statistics, ContentDetails", id=vidid
+        part="snippet,statistics,contentDetails", id=vidid
     )
-    response = request.execute()
+    response = RESPONSE_CACHE.execute(request, http=http, cache=cache)
     return response
 
 
-def get_region_restrictions(items):
-    """Extracts the region code from an item if it exists else it returns 0"""
-    region_restritions = list()
-    for item in items:
-        try:
-            region_restritions.append(
-                item["contentDetails"]["regionRestriction"]["blocked"]
-            )
-        except KeyError:
-            region_restritions.append(["not-blocked"])
-    return region_restritions
-
-
 def get_data_videos(video_responses):
     if isinstance(video_responses, list):  # Vidoes queried individually
         items = [response["items"][0] for response in video_responses]
     else:
         items = video_responses["items"]
-    # Extract values
-    ids = [item["id"] for item in items]
-    durations = [item["contentDetails"]["duration"] for item in items]
-    dimensions = [item["contentDetails"]["dimension"] for item in items]
-    region_restrictions = get_region_restrictions(items)
-    view_counts = [item["statistics"]["viewCount"] for item in items]
-    like_counts = [item["statistics"]["likeCount"] for item in items]
-    favorite_counts = [item["statistics"]["favoriteCount"] for item in items]
-    comment_counts = [item["statistics"].get("commentCount", np.nan) for item in items]
+    # Extract values in a single pass over the items
+    ids, durations, dimensions, region_restrictions = [], [], [], []
+    view_counts, like_counts, favorite_counts, comment_counts = [], [], [], []
+    for item in items:
+        content_details = item["contentDetails"]
+        statistics = item["statistics"]
+        ids.append(item["id"])
+        durations.append(content_details["duration"])
+        dimensions.append(content_details["dimension"])
+        region_restrictions.append(
+            content_details.get("regionRestriction", {}).get("blocked", ["not-blocked"])
+        )
+        view_counts.append(statistics["viewCount"])
+        like_counts.append(statistics["likeCount"])
+        favorite_counts.append(statistics["favoriteCount"])
+        comment_counts.append(statistics.get("commentCount", np.nan))
     # Return dictionary with extracted data
     return {
         "video_ids": ids,
@@ -227,15 +363,16 @@ def get_data_videos(video_responses):
 
 
 def merge_playlist_and_videos(df_videos, df_playlist):
-    df_m = df_playlist.merge(df_videos, how="left", on="video_ids")
+    # Hash join which keeps the order of the left frame, no sorting of the keys
+    df_m = df_playlist.merge(df_videos, how="left", on="video_ids", sort=False)
     return df_m
 
 
-def comments_pager(vidid, youtube, page_token=None):
+def comments_pager(vidid, youtube, page_token=None, http=None, cache=True):
     request = youtube.commentThreads().list(
         part="snippet", maxResults=100, videoId=vidid, pageToken=page_token
     )
-    response = request.execute()
+    response = RESPONSE_CACHE.execute(request, http=http, cache=cache)
     return response
 
 
@@ -243,7 +380,7 @@ def query_single_comment(comment_id, youtube):
     request = youtube.comments().list(
         part="snippet", id=comment_id, 
     )
-    response = request.execute()
+    response = RESPONSE_CACHE.execute(request)
     return response
     
 
@@ -257,32 +394,64 @@ class DataClassPager:
     num_requests: int = 0
 
 
+# Tmp files written (or restored as checkpoints) in this process, so they can
+# be removed by name instead of listing the tmp folder
+_TMP_FILES: set[Path] = set()
+_TMP_FILES_LOCK = threading.Lock()
+
+
 def get_tmp_file(item_id):
     file = FP_DATA_TMP / f"temp-{item_id}.pkl"
     return file
 
 
+def register_tmp_file(file: Path) -> None:
+    with _TMP_FILES_LOCK:
+        _TMP_FILES.add(file)
+
+
+def pop_tmp_files() -> set[Path]:
+    """Returns the tracked tmp files and stops tracking them"""
+    with _TMP_FILES_LOCK:
+        files = set(_TMP_FILES)
+        _TMP_FILES.clear()
+    return files
+
+
 def init_pager(item_id):
     """Uses checkpoint for pager data else creates new container for data"""
     file = get_tmp_file(item_id)
     if file.exists():
         logging.info(f"Checkpoint exists for {item_id}. Starting from checkpoint...")
         pager_data: DataClassPager = data_utils.load_pickle_file(file)
+        register_tmp_file(file)
     else:
         pager_data = DataClassPager(responses=list())
     return pager_data
 
 
 def query_all_items(
-    item_id: str, pager_func: Callable, youtube: googleapiclient.discovery.Resource
+    item_id: str,
+    pager_func: Callable,
+    youtube: googleapiclient.discovery.Resource,
+    http: Union[None, httplib2.Http] = None,
+    cache: bool = True,
 ) -> list[dict]:
-    """Collects all items for given pager function"""
+    """
+    Collects all items for given pager function.
+    The pages are returned as a list, since the pages collected so far are
+    also the checkpoint saved if the quota is exceeded.
+    """
     logging.info(f"Querying all items with func {pager_func.__name__}")
     pager_data = init_pager(item_id)
     while not pager_data.all_items_collected:
         try:
             response = pager_func(
-                item_id, youtube, page_token=pager_data.next_page_token
+                item_id,
+                youtube,
+                page_token=pager_data.next_page_token,
+                http=http,
+                cache=cache,
             )
         except HttpError as e:
             logging.info(f"Error caught when paging for {item_id}")
@@ -323,12 +492,15 @@ def check_quota_exceeded_tmp(e: HttpError, item_id: str, data):
 def save_tmp_data(item_id, data):
     file = get_tmp_file(item_id)
     data_utils.save_pickle(file, data)
+    register_tmp_file(file)
     logging.info(f"Saved data for item id `{item_id}` to temp file {str(file)}")
 
 
 def remove_tmp_data(item_id):
     """Remove tmp file if it exists"""
     file = get_tmp_file(item_id)
+    with _TMP_FILES_LOCK:
+        _TMP_FILES.discard(file)
     if file.exists():
         file.unlink()
         logging.info(f"Removed temporary file {str(file)}")
@@ -369,17 +541,25 @@ def collect_comments_in_thread(item, thread_id):
 
 
 def get_multiple_comment_thread_data(
-    responses_comment_thread: list[dict],
+    responses_comment_thread: Iterable[dict],
 ) -> list[dict]:
-    data_thread = list()
-    for response_comment_thread in responses_comment_thread:
-        data_thread.extend(get_comment_thread_data(response_comment_thread))
+    """
+    Returns the data of the comments in all pages. The pages are consumed
+    one at a time, so `responses_comment_thread` can be a generator.
+    """
+    data_thread = list(
+        chain.from_iterable(map(iter_comment_thread_data, responses_comment_thread))
+    )
     return data_thread
 
 
 def get_comment_thread_data(response_comment_thread: dict) -> list[dict]:
+    return list(iter_comment_thread_data(response_comment_thread))
+
+
+def iter_comment_thread_data(response_comment_thread: dict) -> Iterator[dict]:
+    """Yields the data of the toplevel comments in a page of comment threads"""
     items = response_comment_thread["items"]
-    data_thread = list()
     for item in items:
         # Thread stats
         thread_id = item["id"]
@@ -390,15 +570,14 @@ def get_comment_thread_data(response_comment_thread: dict) -> list[dict]:
         data_top_level["video_id"] = snippet["videoId"]
         data_top_level["total_reply_count"] = snippet["totalReplyCount"]
         data_top_level["thread_id"] = thread_id
-        data_thread.append(data_top_level)
-    return data_thread
+        yield data_top_level
 
 
-def replies_pager(comment_id, youtube, page_token=None):
+def replies_pager(comment_id, youtube, page_token=None, http=None, cache=True):
     request = youtube.comments().list(
         part="snippet", parentId=comment_id, pageToken=page_token, maxResults=50
     )
-    response = request.execute()
+    response = RESPONSE_CACHE.execute(request, http=http, cache=cache)
     return response
 
 
@@ -414,6 +593,7 @@ def init_replies_dict(video_id) -> dict[str, list[dict]]:
         comment_thread_responses: dict[str, list[dict]] = data_utils.load_pickle_file(
             file
         )
+        register_tmp_file(file)
     else:
         comment_thread_responses = dict()
     return comment_thread_responses
@@ -424,35 +604,73 @@ def get_replies_comment_thread(
     data_thread: list[dict],
     youtube: googleapiclient.discovery.Resource,
     pager_func=replies_pager,
+    max_workers: int = MAX_WORKERS_REPLIES,
+    cache: bool = True,
 ) -> dict[str, list[dict]]:
     """
     Returns dictionary with thread ids as key and list of response objects
-    containing the replies in the thread
+    containing the replies in the thread.
+    The replies of the threads are queried concurrently. If a request fails
+    the remaining threads are skipped, the replies collected so far are saved
+    as a checkpoint and the error is reraised.
     """
     comment_thread_responses = init_replies_dict(video_id)
-    for data_top_level in data_thread:
-        if data_top_level["total_reply_count"] > 0:
-            thread_id = data_top_level["thread_id"]
-            if thread_id not in comment_thread_responses:
-                # Only collect if we haven't collected it already
-                try:
-                    comment_thread_responses[thread_id] = query_all_items(
-                        item_id=thread_id, pager_func=pager_func, youtube=youtube
-                    )
-                except HttpError as e:
-                    # To distinguish it from a possible tmp file for toplevel
-                    # comments
-                    id_replies = f"{video_id}-replies"
-                    check_quota_exceeded_tmp(e, id_replies, comment_thread_responses)
-                else:
-                    # Log info about request
-                    num_responses = len(comment_thread_responses)
-                    if num_responses % 20 == 0:
-                        logging.info(
-                            f"Collected replies for thread `{thread_id}`.\n"
-                            f"Total amount of responses `{num_responses}` corresponding to"
-                            f" ~{num_responses * 50} comments"
-                        )
+    # Only collect if we haven't collected it already
+    thread_ids = [
+        data_top_level["thread_id"]
+        for data_top_level in data_thread
+        if data_top_level["total_reply_count"] > 0
+        and data_top_level["thread_id"] not in comment_thread_responses
+    ]
+    if not thread_ids:
+        return comment_thread_responses
+    stop_event = threading.Event()
+
+    def query_thread(thread_id: str) -> Union[None, list[dict]]:
+        if stop_event.is_set():  # Another thread failed
+            return None
+        try:
+            return query_all_items(
+                item_id=thread_id,
+                pager_func=pager_func,
+                youtube=youtube,
+                http=get_thread_http(),
+                cache=cache,
+            )
+        except Exception:
+            stop_event.set()
+            raise
+
+    error = None
+    # Shared pool: its threads keep their Http objects (and connections) between
+    # videos, and the number of reply requests is bounded across all videos
+    ex = get_executor("replies", max_workers)
+    futures = [ex.submit(query_thread, thread_id) for thread_id in thread_ids]
+    for thread_id, future in zip(thread_ids, futures):
+        if future.cancelled():
+            continue
+        try:
+            responses = future.result()
+        except HttpError as e:
+            error = error or e
+            for pending in futures:
+                pending.cancel()
+            continue
+        if responses is None:
+            continue
+        comment_thread_responses[thread_id] = responses
+        # Log info about request
+        num_responses = len(comment_thread_responses)
+        if num_responses % 20 == 0:
+            logging.info(
+                f"Collected replies for thread `{thread_id}`.\n"
+                f"Total amount of responses `{num_responses}` corresponding to"
+                f" ~{num_responses * 50} comments"
+            )
+    if error is not None:
+        # To distinguish it from a possible tmp file for toplevel comments
+        id_replies = f"{video_id}-replies"
+        check_quota_exceeded_tmp(error, id_replies, comment_thread_responses)
     return comment_thread_responses
 
 
@@ -462,26 +680,30 @@ def get_comment_reply_data(
     """
     Returns list of reply comments for all threads of the intput dictionary
     """
-    data_replies: list[dict] = list()
-    for thread_id in comment_thread_responses:
-        responses = comment_thread_responses[thread_id]
-        for response in responses:
-            data_replies.extend(get_data_reply_comment(response, thread_id))
+    data_replies: list[dict] = list(
+        chain.from_iterable(
+            iter_data_reply_comment(response, thread_id)
+            for thread_id, responses in comment_thread_responses.items()
+            for response in responses
+        )
+    )
     return data_replies
 
 
 def get_data_reply_comment(comment_response: dict, thread_id: str) -> list[dict]:
     """Returns list of comment data for given response object of given thread"""
-    comments = [extract_data_comment(comment) for comment in comment_response["items"]]
-    for comment in comments:
-        comment["thread_id"] = thread_id
-    return comments
+    return list(iter_data_reply_comment(comment_response, thread_id))
+
+
+def iter_data_reply_comment(comment_response: dict, thread_id: str) -> Iterator[dict]:
+    for comment in comment_response["items"]:
+        data_comment = extract_data_comment(comment)
+        data_comment["thread_id"] = thread_id
+        yield data_comment
 
 
 def unpack_dict_of_lists(dict_of_lists: dict[str, list[dict]]) -> list[dict]:
-    data = list()
-    for list_values in dict_of_lists.values():
-        data.extend(list_values)
+    data = list(chain.from_iterable(dict_of_lists.values()))
     return data
 
 
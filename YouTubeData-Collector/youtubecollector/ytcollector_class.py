@@ -1,8 +1,15 @@
+import datetime
+import os
+import random
 import time
-from typing import Type
-from collections import OrderedDict
+import threading
+from concurrent.futures import FIRST_COMPLETED, wait
+from typing import Type, Union
+from zoneinfo import ZoneInfo
+from collections import deque
 import logging
 
+import numpy as np
 import pandas as pd
 from googleapiclient.errors import HttpError
 
@@ -18,6 +25,16 @@ from youtubecollector.utils import set_logger
 from youtubecollector.ytcollector import unpack_http_error
 
 RETRY_TIMES = 10  # Arbitrarily set 
+BACKOFF_MAX_DELAY = 60  # Seconds between retries before the jitter is added
+# The quota of the API keys is reset at midnight Pacific time. The zone is only
+# looked up when needed, as it requires tz data (the `tzdata` package on Windows)
+QUOTA_RESET_TZ = "America/Los_Angeles"
+MAX_WORKERS_COMMENTS = 8  # Videos to collect comments from concurrently
+# Comment responses of `YtEntityData` and the names of the logs they are saved to
+COMMENT_LOGS = {
+    "responses_toplevel": "toplevelcomments",
+    "responses_replies": "replies",
+}
 
 def error_api_method(
     times: int, exceptions: tuple[Type[Exception], ...] = (HttpError,)
@@ -30,7 +47,7 @@ def error_api_method(
     def decorator(func):
         def newfn(*args, **kwargs):
             attempt = 0
-            while attempt < times:
+            while True:
                 try:
                     return func(*args, **kwargs)
                 except exceptions as exceptions_caught:
@@ -43,8 +60,14 @@ def error_api_method(
                     # First argument in method is the initialized object
                     yt_entity_data: YtEntityData = args[0]
                     e_http: HttpError = exceptions_caught
+                    if attempt >= times:
+                        # Out of retries, reraise the last error without
+                        # handling it, e.g. waiting for the quota to reset
+                        yt_entity_data.put_videoid_in_buffer_back()
+                        raise
                     # Handle the HTTP error
                     handle_http_error(e_http, yt_entity_data)
+                    time.sleep(get_backoff_delay(attempt))
 
         return newfn
 
@@ -58,6 +81,11 @@ class YtEntityData:
         api_keys: list of api keys
         channels: dictionary with channels and youtube channel ids
         cut_offdate: the start date for the data collection
+        max_workers: number of videos to collect comments from concurrently
+        use_response_cache: reuse API responses cached by previous runs. The
+            upload playlist is always requested again
+        keep_responses: keep the comment responses in memory after they are
+            saved. By default only the ids of the collected videos are kept
     """
 
     def __init__(
@@ -66,10 +94,16 @@ class YtEntityData:
         channels: dict,
         cutoff_date: pd.Timestamp,
         use_logger=True,
+        max_workers: int = MAX_WORKERS_COMMENTS,
+        use_response_cache: bool = True,
+        keep_responses: bool = False,
     ):
         self.use_api_key(api_key)
         self.channels = channels
         self.cutoff_date = cutoff_date
+        self.max_workers = max_workers
+        self.use_response_cache = use_response_cache
+        self.keep_responses = keep_responses
         if use_logger:
             set_logger(prefix="yt-collector")  # Init logger
         self.setup_attributes()
@@ -89,9 +123,15 @@ class YtEntityData:
         self.responses_replies = None
         self.responses_toplevel = None
         self.i = None
+        self._last_flushed_i = None
+        # Folders and comment logs of the channel being collected
+        self._channel_dir_raw = None
+        self._channel_dir_proc = None
+        self._comment_files = None
         self.temp_id_storage = None
         self.videos_with_comments_disabled = None
-        self.comment_threads = None
+        # Guards the comment containers above, which are filled by worker threads
+        self._lock = threading.Lock()
 
     def collect_data_channels(self):
         for channel in self.channels:
@@ -100,9 +140,11 @@ class YtEntityData:
             self.collect_data_channel(channel)
             print(f"... done")
             print(f"-" * 50)
+        self.clear_tmp_storage()  # Leftovers of earlier runs are not needed
 
     def collect_data_channel(self, channel):
         logging.info(f"Collecting data for channel: {channel}")
+        self.set_channel_dirs(channel)
         try:
             self.collect_upload_playlist(channel)
         except KeyError:
@@ -114,10 +156,27 @@ class YtEntityData:
             self.setup_comment_collector()
             self.collect_comments(channel)
 
+    def set_channel_dirs(self, channel):
+        """
+        Creates the folders of the channel once, they are reused by the saves.
+        The comment logs are also picked once, so all saves of the channel
+        append to the same logs, also if the collection runs past midnight.
+        """
+        self._channel_dir_raw = FP_DATA_RAW / channel
+        self._channel_dir_proc = FP_DATA_PROC / channel
+        for folder in (self._channel_dir_raw, self._channel_dir_proc):
+            folder.mkdir(parents=True, exist_ok=True)
+        self._comment_files = {
+            attr_name: data_utils.get_file_comments(
+                f"{channel}-{log_name}", self._channel_dir_raw
+            )
+            for attr_name, log_name in COMMENT_LOGS.items()
+        }
+
     @error_api_method(times=RETRY_TIMES)
     def collect_upload_playlist(self, channel):
         self.channel_response = ytcollector.search_channel_id(
-            self.youtube, self.channels[channel]
+            self.youtube, self.channels[channel], cache=self.use_response_cache
         )
         upload_playlist_id = ytcollector.get_upload_playlist_id(self.channel_response)
         logging.info(
@@ -127,13 +186,17 @@ class YtEntityData:
             upload_playlist_id, self.youtube, cutoff_date=self.cutoff_date
         )
         data_utils.save_response(
-            self.upload_responses, f"{channel}-uploadplaylist-responses", folder=channel
+            self.upload_responses,
+            f"{channel}-uploadplaylist-responses",
+            folder=self._channel_dir_raw,
         )
         self.df_upload_playlist = ytcollector.get_dataframe_responses(
             self.upload_responses, ytcollector.get_data_videos_playlist
         )
         data_utils.save_df(
-            self.df_upload_playlist, f"{channel}-upload-playlist", folder=channel
+            self.df_upload_playlist,
+            f"{channel}-upload-playlist",
+            folder=self._channel_dir_proc,
         )
         self.vid_ids = self.df_upload_playlist.video_ids.tolist()
         logging.info(
@@ -144,10 +207,12 @@ class YtEntityData:
     @error_api_method(times=RETRY_TIMES)
     def collect_videos(self, channel):
         self.videos_responses = ytcollector.query_videos_list(
-            self.vid_ids, self.youtube
+            self.vid_ids, self.youtube, cache=self.use_response_cache
         )
         data_utils.save_response(
-            self.videos_responses, f"{channel}-video-responses", folder=channel
+            self.videos_responses,
+            f"{channel}-video-responses",
+            folder=self._channel_dir_raw,
         )
         self.df_videos = ytcollector.get_dataframe_responses(
             self.videos_responses, ytcollector.get_data_videos
@@ -159,7 +224,9 @@ class YtEntityData:
         self.df_m = ytcollector.merge_playlist_and_videos(
             self.df_upload_playlist, self.df_videos
         )
-        data_utils.save_df(self.df_m, f"{channel}-video-playlist", folder=channel)
+        data_utils.save_df(
+            self.df_m, f"{channel}-video-playlist", folder=self._channel_dir_proc
+        )
         self.get_videoids_to_collect()
         logging.info(
             f"Initialized list of video ids to collect "
@@ -168,33 +235,62 @@ class YtEntityData:
 
     def get_videoids_to_collect(self):
         # Init list of video ids to collect
-        self.video_ids = self.df_m.video_ids.tolist()[::-1]
-        self.videos_ids_to_collect = list(self.video_ids)  # Copy
+        self.video_ids = get_reversed_video_ids(self.df_m)
+        # Ids are popped from (and put back onto) the right end
+        self.videos_ids_to_collect = deque(self.video_ids)
         self.collected_video_ids = list()
 
     @error_api_method(times=RETRY_TIMES)
     def collect_comments(self, channel):
         """
         Collects all comments of the videos specified in the list `video_ids`.
+        Up to `max_workers` videos are collected concurrently. Bookkeeping is
+        done in the calling thread as each video finishes. If collecting a
+        video fails, no new videos are started, the running ones are finished
+        and the first error is reraised to the retry decorator.
         """
         logging.info(
             f"Collecting comments for channel: {channel}\n"
             f"Current time is {data_utils.get_current_time()}"
         )
-        while self.videos_ids_to_collect:
-            video_id = self.get_video_id_to_collect()
-            self.safe_collect_comments_video(video_id)
-            self.bookkeeping_comments(channel, video_id)
+        error = None
+        # Shared pool, so the connections of its threads are reused between
+        # channels and retries
+        ex = ytcollector.get_executor("comments", self.max_workers)
+        in_flight = dict()
+        while (self.videos_ids_to_collect and error is None) or in_flight:
+            while (
+                error is None
+                and self.videos_ids_to_collect
+                and len(in_flight) < self.max_workers
+            ):
+                video_id = self.get_video_id_to_collect()
+                future = ex.submit(self.safe_collect_comments_video, video_id)
+                in_flight[future] = video_id
+            done, _ = wait(in_flight, return_when=FIRST_COMPLETED)
+            for future in done:
+                video_id = in_flight.pop(future)
+                try:
+                    future.result()
+                except Exception as e:
+                    error = error or e
+                else:
+                    self.bookkeeping_comments(channel, video_id)
+        if error is not None:
+            raise error
         self.save_comments(channel)  # Save comments after last iteration also
+        self.compact_comments(channel)
         self.flush_all_tmp_storage()  # Flush everything in tmp also
 
     def setup_comment_collector(self):
         """
         Sets up dictionaries and lists to store data for collecting comments
         """
-        self.responses_replies: OrderedDict[str, list[dict]] = OrderedDict()
-        self.responses_toplevel: OrderedDict[str, list[dict]] = OrderedDict()
+        self.responses_replies: dict[str, list[dict]] = dict()
+        self.responses_toplevel: dict[str, list[dict]] = dict()
         self.i = len(self.collected_video_ids)
+        # Number of collected video ids saved by `save_comments`
+        self._last_flushed_i = len(self.collected_video_ids)
         self.temp_id_storage = list()  # Store video id temporarily
         self.videos_with_comments_disabled = list()
 
@@ -232,12 +328,16 @@ class YtEntityData:
 
     def collect_toplevel_comments(self, video_id):
         # Init happens inside `ytcollector.query_all_items`
-        self.comment_threads = ytcollector.query_all_items(
-            video_id, ytcollector.comments_pager, self.youtube
+        comment_threads = ytcollector.query_all_items(
+            video_id,
+            ytcollector.comments_pager,
+            self.youtube,
+            http=ytcollector.get_thread_http(),
+            cache=self.use_response_cache,
         )
-        self.responses_toplevel[  # Empty list if no replies
-            video_id
-        ] = ytcollector.get_multiple_comment_thread_data(self.comment_threads)
+        data_thread = ytcollector.get_multiple_comment_thread_data(comment_threads)
+        with self._lock:
+            self.responses_toplevel[video_id] = data_thread  # Empty list if no replies
 
     def collect_comment_replies(self, video_id):
         """
@@ -246,14 +346,17 @@ class YtEntityData:
         """
         # Collect replies to the comment which have replies
         if self.responses_toplevel[video_id]:  # Handle no replies case
-            self.comment_thread_responses = ytcollector.get_replies_comment_thread(
-                video_id, self.responses_toplevel[video_id], self.youtube
+            comment_thread_responses = ytcollector.get_replies_comment_thread(
+                video_id,
+                self.responses_toplevel[video_id],
+                self.youtube,
+                cache=self.use_response_cache,
             )
             logging.info(f"Collected comment threads for video {video_id}")
             # Extract and proc the data from the comment thread replies
-            self.responses_replies[video_id] = ytcollector.get_comment_reply_data(
-                self.comment_thread_responses
-            )
+            data_replies = ytcollector.get_comment_reply_data(comment_thread_responses)
+            with self._lock:
+                self.responses_replies[video_id] = data_replies
         else:
             logging.info(f"No replies for video `{video_id}`")
 
@@ -268,7 +371,8 @@ class YtEntityData:
             raise e
         else:
             if reason == "commentsDisabled":
-                self.videos_with_comments_disabled.append(video_id)
+                with self._lock:
+                    self.videos_with_comments_disabled.append(video_id)
                 logging.info(
                     f"Caught HttpError for {video_id} with e = `{e}` because of disabled comments"
                 )
@@ -283,15 +387,14 @@ class YtEntityData:
             f"[{data_utils.get_current_time()}]"
             f"Collected comments for video `{video_id}` on channel `{channel}`"
         )
-        # Save files
-        if self.i % 50 == 0:
-            self.save_comments(channel)  # Save files each time for now ...
-            self.flush_all_tmp_storage()  # Flush all
         # Add collected video id to set of collected video ids
         self.collected_video_ids.append(video_id)
         # "Flush the buffer"
-        self.temp_id_storage.pop()
+        self.temp_id_storage.remove(video_id)
         self.i += 1
+        # Save files
+        if self.i % 50 == 0:
+            self.save_comments(channel)  # Appends the videos since last save
 
     def save_comments(self, channel):
         msg = (
@@ -300,68 +403,155 @@ class YtEntityData:
         )
         logging.info(msg)
         print(msg)
-        for responses, name in zip(
-            [self.responses_toplevel, self.responses_replies],
-            [f"{channel}-toplevelcomments", f"{channel}-replies"],
+        # Only the videos collected since the last save are appended. Videos
+        # still being collected by the worker threads are saved next time
+        video_ids = self.collected_video_ids[self._last_flushed_i :]
+        with self._lock:
+            responses_toplevel, responses_replies = (
+                dict(
+                    (video_id, responses[video_id])
+                    for video_id in video_ids
+                    if video_id in responses  # Not there if comments disabled
+                )
+                for responses in (self.responses_toplevel, self.responses_replies)
+            )
+            videos_with_comments_disabled = list(self.videos_with_comments_disabled)
+        for responses, attr_name in zip(
+            [responses_toplevel, responses_replies], COMMENT_LOGS
         ):
             data_utils.save_response_comments(
-                responses, name, folder=f"{channel}",
+                responses, self._comment_files[attr_name]
             )
         # Save the video ids with disabled comments
         data_utils.save_videos_with_disabled_comments(
-            self.videos_with_comments_disabled,
+            videos_with_comments_disabled,
             name=f"{channel}-disabled-comments-videoids",
-            folder=f"{channel}",
+            folder=self._channel_dir_raw,
         )
+        self._last_flushed_i += len(video_ids)
+        # The tmp files are only removed once the comments are saved. Only the
+        # saved videos are flushed, other videos may still be collected by the
+        # worker threads
+        for video_id in video_ids:
+            thread_ids = [
+                data_top_level["thread_id"]
+                for data_top_level in responses_toplevel.get(video_id, ())
+                if data_top_level["total_reply_count"] > 0
+            ]
+            self.flush_tmp_storage_comments(video_id, thread_ids)
+        self.drop_saved_responses(video_ids)
+
+    def drop_saved_responses(self, video_ids) -> None:
+        """
+        Removes the saved responses of the videos from memory, unless
+        `keep_responses` is set. They are read back from the saved files
+        when restoring from a checkpoint.
+        """
+        if self.keep_responses:
+            return None
+        with self._lock:
+            for responses in (self.responses_toplevel, self.responses_replies):
+                if responses is None:  # No file to restore from
+                    continue
+                for video_id in video_ids:
+                    responses.pop(video_id, None)
+
+    def compact_comments(self, channel):
+        """
+        Rewrites the comment files appended to by `save_comments` as one
+        stream each, once all comments of the channel are collected.
+        """
+        for file in self._comment_files.values():
+            data_utils.finalize_response_comments(file)
 
-    def flush_tmp_storage_comments(self, video_id):
+    def flush_tmp_storage_comments(self, video_id, thread_ids=()):
         """
         Removes temporary files (if they exist) for toplevel comments 
-        and replies for given video_id.
+        and replies for given video_id, and for the replies of the threads
+        in `thread_ids`.
         """
         replies_id = f"{video_id}-replies"
-        for id_ in [video_id, replies_id]:
+        for id_ in [video_id, replies_id, *thread_ids]:
             ytcollector.remove_tmp_data(id_)
 
     def flush_all_tmp_storage(self):
         """
-        Flushes the tmp storage folder.
+        Flushes the tmp files written or restored during the collection.
+        """
+        tmp_files = ytcollector.pop_tmp_files()
+        for file in tmp_files:
+            try:
+                os.unlink(file)
+            except FileNotFoundError:
+                pass
+        logging.info(f"Removed {len(tmp_files)} temporary files in {str(FP_DATA_TMP)}")
+
+    def clear_tmp_storage(self):
+        """
+        Removes all files in the tmp storage folder, including checkpoints
+        left behind by earlier runs. Folders (e.g. the response cache) are kept.
         """
-        for file in FP_DATA_TMP.glob("*"):
-            if file.is_file():
-                file.unlink()
+        with os.scandir(FP_DATA_TMP) as entries:
+            for entry in entries:
+                if entry.is_file(follow_symlinks=False):
+                    try:
+                        os.unlink(entry.path)
+                    except FileNotFoundError:
+                        pass
+        ytcollector.pop_tmp_files()
         logging.info(f"Removed all temporary files in {str(FP_DATA_TMP)}")
 
     def use_api_key(self, api_key):
-        """Build a Ressource object with specified API key"""
+        """
+        Build a Ressource object with specified API key.
+        The requests share one Http object, so the connection to the API
+        is kept alive between requests.
+        """
+        self.close()
         self.current_api_key = api_key
-        self.youtube = ytcollector.get_youtube_build(api_key)
+        self.youtube = ytcollector.build_service(api_key)
+        self._http = self.youtube._http
         logging.info(f"Using API key: {self.current_api_key}")
-        time.sleep(0.5)
+
+    def close(self):
+        """Closes the connections of the Http object used for requests"""
+        http = getattr(self, "_http", None)
+        if http is not None:
+            http.close()
+            self._http = None
 
     def put_videoid_in_buffer_back(self):
         """
-        Function to put current video_id back into list of ids to collect
-        before next try.
+        Function to put the video ids being collected back into list of ids
+        to collect before next try.
         Used in the retry decorator
         """
-        if hasattr(self, "temp_id_storage"):
-            if len(self.temp_id_storage) > 0:
-                # If has buffer and buffer non empty
-                video_id = self.temp_id_storage.pop()
-                self.videos_ids_to_collect.append(video_id)
-                print(f"Put id `{video_id}` back in list of video ids to collect")
+        # If has buffer and buffer non empty
+        while getattr(self, "temp_id_storage", None):
+            video_id = self.temp_id_storage.pop()
+            self.videos_ids_to_collect.append(video_id)
+            print(f"Put id `{video_id}` back in list of video ids to collect")
+
+
+def get_reversed_video_ids(df_m: pd.DataFrame) -> list[str]:
+    """
+    Returns the video ids in reverse order, such that popping from the end
+    collects the videos in the order of the dataframe.
+    """
+    # Reversing the array is a view, so the ids are only copied by `tolist`
+    return df_m["video_ids"].to_numpy()[::-1].tolist()
 
 
 def handle_http_error(e: HttpError, yt_entity_data: YtEntityData):
     """
     Function to handle errors returned from the API. 
     Retries the function if error is not due to: 
-        `quotaExceeded`
         `forbidden`
         `accessNotConfigured`   
-    If the reason for the HttpError is one of the three above, 
+    If the reason for the HttpError is one of the two above, 
     the function raises an `AssertionError`. 
+    If the reason is `quotaExceeded` it sleeps until the quota is reset
+    before the function is retried.
     
     Example repr of the error response:
     '<HttpError %s when requesting %s returned "%s". Details: "%s">'
@@ -386,23 +576,72 @@ def handle_http_error(e: HttpError, yt_entity_data: YtEntityData):
         logging.info(
             "Could not unpack the reason of the http error. " f"Error caught: {e}"
         )
-        time.sleep(2)
     else:
-        if reason == "quotaExceeded":
-            msg = f"Quota limit exceeded. Wait until quotaLimit expires."
-            raise AssertionError(msg)
-        elif reason == "forbidden":
-            msg = f"API key `{yt_entity_data.current_api_key}` is suspended. "
-            raise AssertionError(msg)
-        elif reason == "accessNotConfigured":
-            msg = f"API key not activated, activate it at google cloud"
-            raise AssertionError(msg)
-        else:
-            logging.info(
-                "Got HTTP error for reason other than quotaExceeded, forbidden,"
-                " or accessNotConfigured, sleeping for 5 secs..."
-            )
-            time.sleep(5)
+        handler = _REASON_HANDLERS.get(reason, _on_retryable)
+        handler(yt_entity_data)
+
+
+def get_backoff_delay(attempt: int) -> float:
+    """Exponential backoff with jitter, so retries are spread out"""
+    return min(BACKOFF_MAX_DELAY, 2**attempt) + random.uniform(0, 1)
+
+
+def get_seconds_until_quota_reset(now: Union[None, datetime.datetime] = None) -> float:
+    """Seconds until the next midnight Pacific time"""
+    tz = ZoneInfo(QUOTA_RESET_TZ)
+    now = (now or datetime.datetime.now(tz)).astimezone(tz)
+    reset = datetime.datetime.combine(
+        now.date() + datetime.timedelta(days=1), datetime.time(), tzinfo=tz
+    )
+    # Datetimes in the same zone are subtracted as wall clock times, which
+    # is off by an hour on the days daylight saving time starts or ends
+    utc = datetime.timezone.utc
+    return (reset.astimezone(utc) - now.astimezone(utc)).total_seconds()
+
+
+def wait_for_quota_reset() -> None:
+    seconds = get_seconds_until_quota_reset()
+    msg = f"Quota limit exceeded. Sleeping {seconds / 3600:.1f} hours until reset."
+    logging.info(msg)
+    print(msg)
+    time.sleep(seconds)
+
+
+def _on_quota(yt_entity_data: YtEntityData) -> None:
+    wait_for_quota_reset()
+
+
+def _on_forbidden(yt_entity_data: YtEntityData) -> None:
+    msg = f"API key `{yt_entity_data.current_api_key}` is suspended. "
+    raise AssertionError(msg)
+
+
+def _on_access(yt_entity_data: YtEntityData) -> None:
+    msg = f"API key not activated, activate it at google cloud"
+    raise AssertionError(msg)
+
+
+def _on_retryable(yt_entity_data: YtEntityData) -> None:
+    logging.info(
+        "Got HTTP error for reason other than quotaExceeded, forbidden,"
+        " or accessNotConfigured, retrying with backoff..."
+    )
+
+
+# Handlers for the reasons of HTTP errors, other reasons are retried
+_REASON_HANDLERS = {
+    "quotaExceeded": _on_quota,
+    "forbidden": _on_forbidden,
+    "accessNotConfigured": _on_access,
+}
+
+
+# Empty containers for the comment data which have not been saved yet
+RESTORE_DEFAULTS = {
+    "responses_toplevel": dict,
+    "responses_replies": dict,
+    "videos_with_comments_disabled": list,
+}
 
 
 class YtEntityDataCheckpoint:
@@ -413,15 +652,26 @@ class YtEntityDataCheckpoint:
         channel: name of channel to restore data for 
         date: date of download of data 
         yt_entity_data: yt data object 
+        prune_columns: only read the `video_ids` column of `df_m`, which is
+            the only column needed to continue the collection
     """
 
-    def __init__(self, channel: str, date: str, yt_entity_data: YtEntityData):
+    def __init__(
+        self,
+        channel: str,
+        date: str,
+        yt_entity_data: YtEntityData,
+        prune_columns: bool = True,
+    ):
         self.channel = channel
         self.date = date
         self.yt_entity_data = yt_entity_data
+        self.prune_columns = prune_columns
 
     def restore_obj_from_checkpoint(self):
-        self.restore_responses()
+        self.yt_entity_data.set_channel_dirs(self.channel)
+        restored_files = self.restore_responses()
+        self.continue_comment_logs(restored_files)
         self.restore_dfs()
         self.handle_collected_comments()
         return self.yt_entity_data
@@ -436,54 +686,93 @@ class YtEntityDataCheckpoint:
             "videos_with_comments_disabled",
         ]
         folder = FP_DATA_RAW / self.channel
+        restored_files = dict()
         for name, attr_name in zip(data_types, attr_names):
             if name == "disabled":  # Temporary name fix
                 name = f"{name}*{self.date}"
             else:
                 name = f"{self.channel}*{name}*{self.date}"
+            restored_files[attr_name] = self.find_file(folder, name)
             file = self.read_file(folder, name)
+            if file is None and attr_name in RESTORE_DEFAULTS:
+                # Nothing saved yet, e.g. stopped before the first save
+                file = RESTORE_DEFAULTS[attr_name]()
             setattr(self.yt_entity_data, attr_name, file)
+        return restored_files
+
+    def continue_comment_logs(self, restored_files: dict):
+        """
+        Makes the saves append to the restored comment logs, such that all
+        comments of the channel end up in one log. Comments restored from
+        files of other formats are first saved to the new logs.
+        """
+        comment_files = self.yt_entity_data._comment_files
+        for attr_name in COMMENT_LOGS:
+            file = restored_files[attr_name]
+            if file is not None and file.suffix == f".{data_utils.COMMENTS_SUFFIX}":
+                comment_files[attr_name] = file
+            elif responses := getattr(self.yt_entity_data, attr_name):
+                data_utils.save_response_comments(responses, comment_files[attr_name])
 
     def restore_dfs(self):
         types_df = ["upload", "video"]
         names_df = ["df_upload_playlist", "df_m"]
+        columns_df = [None, ["video_ids"] if self.prune_columns else None]
         folder = FP_DATA_PROC / self.channel
-        for name, attr_name in zip(types_df, names_df):
-            file = self.read_file(folder, name, proc=True)
+        for name, attr_name, columns in zip(types_df, names_df, columns_df):
+            file = self.read_file(folder, name, proc=True, columns=columns)
             setattr(self.yt_entity_data, attr_name, file)
 
-    def read_file(self, folder, name, proc=False):
+    def find_file(self, folder, name):
+        """Returns the latest file matching `name` or None if there is none"""
+        try:
+            return proc_utils.get_file(folder, name)
+        except AssertionError:
+            return None
+
+    def read_file(self, folder, name, proc=False, columns=None):
         """
         Wrapper around reading files.
         Set none as attribute if file does not exist.
+        If `columns` is given only those columns are read from parquet files.
         """
-        try:
-            file = proc_utils.get_file(folder, name)
-        except AssertionError:
-            file = None
-        else:
+        file = self.find_file(folder, name)
+        if file is not None:
             if proc:
-                return pd.read_parquet(file)
-            return data_utils.load_pickle_file(file)
+                return proc_utils.read_parquet(file, columns=columns)
+            return data_utils.load_response_file(file)
 
     def handle_collected_comments(self):
-        self.yt_entity_data.video_ids = self.yt_entity_data.df_m.video_ids.tolist()[
-            ::-1
-        ]
+        self.yt_entity_data.video_ids = get_reversed_video_ids(
+            self.yt_entity_data.df_m
+        )
         self.yt_entity_data.collected_video_ids = list(
             self.yt_entity_data.responses_toplevel.keys()
         )
-        self.yt_entity_data.videos_ids_to_collect = [
-            video_id
-            for video_id in self.yt_entity_data.video_ids
-            if video_id not in self.yt_entity_data.collected_video_ids
-        ]
+        # Fixed width strings, so the membership test runs in numpy
+        video_ids = np.array(self.yt_entity_data.video_ids, dtype=str)
+        collected = np.array(self.yt_entity_data.collected_video_ids, dtype=str)
+        mask = ~np.isin(video_ids, collected)  # Keeps the order of `video_ids`
+        self.yt_entity_data.videos_ids_to_collect = deque(video_ids[mask].tolist())
         print(
             f"Total number of videoes: {len(self.yt_entity_data.video_ids)}",
             f"Number of collected videos: {(num_collected := len(self.yt_entity_data.collected_video_ids))}",
             f"Number of videos to collect comments from: {len(self.yt_entity_data.videos_ids_to_collect)}",
             sep="\n",
         )
-        # Set counter and init buffer
+        # Set counter and init buffer. The restored videos are already saved
         self.yt_entity_data.i = num_collected
+        self.yt_entity_data._last_flushed_i = num_collected
+        # Only drop the responses held by the logs the saves continue in, see
+        # `continue_comment_logs`, anything else would be lost
+        saved_video_ids = data_utils.get_saved_video_ids(
+            self.yt_entity_data._comment_files["responses_toplevel"]
+        )
+        self.yt_entity_data.drop_saved_responses(
+            [
+                video_id
+                for video_id in self.yt_entity_data.collected_video_ids
+                if video_id in saved_video_ids
+            ]
+        )
         self.yt_entity_data.temp_id_storage = list()